@@ -0,0 +1,111 @@
+"""
+Brand x platform layout for scorecard metrics.
+
+Each metric is stored as one flat numeric array, brand-major:
+values[metric][brand_index * len(platforms) + platform_index]
+Metrics without platforms hold one value per brand.
+"""
+
+from itertools import chain
+
+# Brand -> short label used in exports and food cost % bands as
+# (upper limit, points), checked in order. Above the last limit scores 0.
+BRANDS = {
+    "amritsari": {
+        "label": "A",
+        "food_cost_bands": [(22, 10), (23, 9), (24, 8), (25, 7), (26, 6), (27, 5)],
+    },
+    "chennai": {
+        "label": "C",
+        "food_cost_bands": [(18, 10), (19, 9), (20, 8), (21, 7), (22, 5)],
+    },
+    "chaat_masala": {
+        "label": "CM",
+        "food_cost_bands": [(24, 10), (25, 9), (26, 8), (27, 7), (28, 6), (29, 5)],
+    },
+}
+
+PLATFORMS = ["google", "zomato", "swiggy"]
+
+# Metric -> platforms it is measured on (None = one value per brand)
+METRIC_PLATFORMS = {
+    "rating": ["google", "zomato", "swiggy"],
+    "food_cost": None,
+    "online_activity": ["zomato", "swiggy"],
+    "kitchen_prep": ["zomato", "swiggy"],
+    "bad_order": ["zomato"],
+    "delay_order": ["swiggy"],
+    "mistakes": None,
+    "total_sale": None,
+    "add_on_sale": None,
+}
+
+# Metrics that are counts and must hold whole numbers
+INTEGER_METRICS = {"mistakes"}
+
+# The named-field wire format (MetricsInput) only covers these brands
+LEGACY_BRANDS = ["amritsari", "chennai", "chaat_masala"]
+
+
+def metric_width(metric: str) -> int:
+    platforms = METRIC_PLATFORMS[metric]
+    return len(platforms) if platforms else 1
+
+
+def series(values: dict, metric: str, *platforms: str) -> list[float]:
+    """
+    Values of a metric across all brands, brand-major, optionally limited
+    to some platforms. Without platforms every value is returned.
+    """
+    arr = values[metric]
+    layout = METRIC_PLATFORMS[metric]
+    if not platforms or layout is None:
+        return arr
+    width = len(layout)
+    if len(platforms) == 1:
+        return arr[layout.index(platforms[0])::width]
+    keep = {layout.index(p) for p in platforms}
+    return [v for i, v in enumerate(arr) if i % width in keep]
+
+
+def legacy_key(metric: str, brand: str, platform: str = None) -> str:
+    """
+    Field name of a (metric, brand, platform) cell in MetricsInput.
+    """
+    if metric == "rating":
+        return f"{platform}_rating_{brand}"
+    if platform is None:
+        return f"{metric}_{brand}"
+    return f"{metric}_{brand}_{platform}"
+
+
+# (metric, MetricsInput field names in array order), built once
+LEGACY_FIELDS = [
+    (metric, [
+        legacy_key(metric, brand, platform)
+        for brand in LEGACY_BRANDS
+        for platform in (platforms or [None])
+    ])
+    for metric, platforms in METRIC_PLATFORMS.items()
+]
+
+# All MetricsInput field names, in the order of the concatenated arrays
+LEGACY_KEYS = [key for _, keys in LEGACY_FIELDS for key in keys]
+
+
+def from_legacy(flat: dict) -> dict:
+    """
+    Converts a MetricsInput-shaped dict into per-metric arrays.
+    """
+    return {
+        metric: [float(flat[key]) for key in keys]
+        for metric, keys in LEGACY_FIELDS
+    }
+
+
+def to_legacy(values: dict) -> dict:
+    """
+    Inverse of from_legacy. Only valid when the brands are LEGACY_BRANDS.
+    Counts come back as floats; MetricsInput coerces whole numbers.
+    """
+    return dict(zip(LEGACY_KEYS, chain.from_iterable(values[m] for m in METRIC_PLATFORMS)))
@@ -1,7 +1,8 @@
+import dimensions
 
-def calculate_google_rating_score(r1: float, r2: float, r3: float) -> int:
+def calculate_rating_score(ratings: list[float]) -> int:
     """
-    Avg of 3 ratings -> Score.
+    Avg of any number of ratings -> Score.
     4 and above 10pt
     3.9 9pt
     3.8 8pt
@@ -10,7 +11,8 @@ def calculate_google_rating_score(r1: float, r2: float, r3: float) -> int:
     3.5 5pt
     Below 0pt (Assumed < 3.5 is 0)
     """
-    avg = (r1 + r2 + r3) / 3
+    if not ratings: return 0
+    avg = sum(ratings) / len(ratings)
     if avg >= 4.0: return 10
     if avg >= 3.9: return 9
     if avg >= 3.8: return 8
@@ -19,21 +21,31 @@ def calculate_google_rating_score(r1: float, r2: float, r3: float) -> int:
     if avg >= 3.5: return 5
     return 0
 
+def calculate_google_rating_score(r1: float, r2: float, r3: float) -> int:
+    """
+    Avg of 3 ratings -> Score. See calculate_rating_score.
+    """
+    return calculate_rating_score([r1, r2, r3])
+
 def calculate_zomato_swiggy_score(ratings: list[float]) -> int:
     """
     Avg of X ratings (now 6) -> Score.
     Same scale as Google.
     """
-    if not ratings: return 0
-    avg = sum(ratings) / len(ratings)
-    # Scale from 3.5 to 4.0
-    if avg >= 4.0: return 10
-    if avg >= 3.9: return 9
-    if avg >= 3.8: return 8
-    if avg >= 3.7: return 7
-    if avg >= 3.6: return 6
-    if avg >= 3.5: return 5
-    return 0
+    return calculate_rating_score(ratings)
+
+def calculate_brand_food_cost_score(brands: list[str], pcts: list[float]) -> int:
+    """
+    Scores each brand's food cost % against its bands in dimensions.BRANDS.
+    Total = Sum of scores.
+    """
+    total = 0
+    for brand, pct in zip(brands, pcts):
+        for limit, points in dimensions.BRANDS[brand]["food_cost_bands"]:
+            if pct <= limit:
+                total += points
+                break
+    return total
 
 def calculate_food_cost_score(amritsari_pct: float, chennai_pct: float, chaat_masala_pct: float) -> int:
     """
@@ -42,36 +54,10 @@ def calculate_food_cost_score(amritsari_pct: float, chennai_pct: float, chaat_ma
     Chaat Masala: 24% & below(10), 25(9), 26(8), 27(7), 28(6), 29(5), >=30(0)
     Total = Sum of scores.
     """
-    def score_amritsari(pct):
-        if pct <= 22: return 10
-        if pct <= 23: return 9
-        if pct <= 24: return 8
-        if pct <= 25: return 7
-        if pct <= 26: return 6
-        if pct <= 27: return 5
-        return 0
-
-    def score_chaat_masala(pct):
-        if pct <= 24: return 10
-        if pct <= 25: return 9
-        if pct <= 26: return 8
-        if pct <= 27: return 7
-        if pct <= 28: return 6
-        if pct <= 29: return 5
-        return 0
-
-    s1 = score_amritsari(amritsari_pct)
-    s2 = 0
-    if chennai_pct <= 18: s2 = 10
-    elif chennai_pct <= 19: s2 = 9
-    elif chennai_pct <= 20: s2 = 8
-    elif chennai_pct <= 21: s2 = 7
-    elif chennai_pct <= 22: s2 = 5
-    else: s2 = 0
-
-    s3 = score_chaat_masala(chaat_masala_pct)
-
-    return s1 + s2 + s3
+    return calculate_brand_food_cost_score(
+        dimensions.LEGACY_BRANDS,
+        [amritsari_pct, chennai_pct, chaat_masala_pct],
+    )
 
 def calculate_online_activity_score(percentages: list[float]) -> int:
     """
@@ -149,24 +135,25 @@ def calculate_bad_delay_score(bad_pcts: list[float], delay_pcts: list[float]) ->
         
     return bad_score + delay_score
 
-def calculate_outlet_audit_score(mistakes_a: int, mistakes_c: int, mistakes_cm: int) -> float:
+def calculate_audit_score(mistakes: list[float]) -> float:
     """
-    Score each separately out of 20. Then Avg.
+    Score each outlet separately out of 20. Then Avg.
     10(0)...0(20). Formula: 20 - 2*mistakes, bounded 0-20.
     """
-    def score_mistakes(m):
-        raw = 20 - (2 * m)
-        return max(0, min(20, raw))
-        
-    s1 = score_mistakes(mistakes_a)
-    s2 = score_mistakes(mistakes_c)
-    s3 = score_mistakes(mistakes_cm)
-    return (s1 + s2 + s3) / 3
+    if not mistakes: return 0
+    scores = [max(0, min(20, 20 - (2 * m))) for m in mistakes]
+    return sum(scores) / len(scores)
 
-def calculate_add_on_sale_score(ts_a: float, aos_a: float, ts_c: float, aos_c: float, ts_cm: float, aos_cm: float) -> float:
+def calculate_outlet_audit_score(mistakes_a: int, mistakes_c: int, mistakes_cm: int) -> float:
+    """
+    Avg of the 3 outlet scores. See calculate_audit_score.
+    """
+    return calculate_audit_score([mistakes_a, mistakes_c, mistakes_cm])
+
+def calculate_add_on_score(total_sales: list[float], add_on_sales: list[float]) -> float:
     """
-    Rating(%) = AOS/TS * 100
-    Avg of the 3 scores.
+    Rating(%) = AOS/TS * 100 for each outlet.
+    Avg of the scores.
     """
     def score_aos(ts, aos):
         if ts <= 0: return 0
@@ -179,8 +166,13 @@ def calculate_add_on_sale_score(ts_a: float, aos_a: float, ts_c: float, aos_c: f
         if pct >= 11: return 2
         return 0
 
-    s1 = score_aos(ts_a, aos_a)
-    s2 = score_aos(ts_c, aos_c)
-    s3 = score_aos(ts_cm, aos_cm)
-    return (s1 + s2 + s3) / 3
+    if not total_sales: return 0
+    scores = [score_aos(ts, aos) for ts, aos in zip(total_sales, add_on_sales)]
+    return sum(scores) / len(scores)
+
+def calculate_add_on_sale_score(ts_a: float, aos_a: float, ts_c: float, aos_c: float, ts_cm: float, aos_cm: float) -> float:
+    """
+    Avg of the 3 outlet scores. See calculate_add_on_score.
+    """
+    return calculate_add_on_score([ts_a, ts_c, ts_cm], [aos_a, aos_c, aos_cm])
 
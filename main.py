@@ -1,30 +1,38 @@
 from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, func, inspect, text
 from sqlalchemy.orm import sessionmaker, Session
 from fastapi.responses import FileResponse
 import os
-from datetime import datetime
+import logging
+from datetime import datetime, timedelta
 import tempfile
 import openpyxl
 from typing import List
+from sqlalchemy.orm.attributes import flag_modified
+from pydantic import ValidationError
 
 from models import (
     Base,
     ScorecardDB,
-    MetricsInput,
+    SyncStateDB,
+    SyncCursorDB,
+    Metrics,
     ScorecardCreate,
     ScorecardResponse,
+    ChangesResponse,
     Breakdown,
 )
 import logic
+import dimensions
 
 app = FastAPI(title="Manager Reward System")
+logger = logging.getLogger(__name__)
 
 # =========================
 # Database Setup
 # =========================
-SQLALCHEMY_DATABASE_URL = "sqlite:///./rewards.db"
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./rewards.db")
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
@@ -39,6 +47,43 @@ SessionLocal = sessionmaker(
 
 Base.metadata.create_all(bind=engine)
 
+def migrate_change_feed():
+    """
+    Adds the change feed columns to databases created before they existed,
+    backfills a sequence for old rows and seeds the sync_state row.
+    """
+    columns = {c["name"] for c in inspect(engine).get_columns("scorecards")}
+
+    with engine.begin() as conn:
+        if "change_seq" not in columns:
+            conn.execute(text("ALTER TABLE scorecards ADD COLUMN change_seq INTEGER"))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_scorecards_change_seq ON scorecards (change_seq)"
+            ))
+        if "deleted_at" not in columns:
+            conn.execute(text("ALTER TABLE scorecards ADD COLUMN deleted_at DATETIME"))
+
+        conn.execute(text("UPDATE scorecards SET change_seq = id WHERE change_seq IS NULL"))
+        conn.execute(text(
+            "INSERT OR IGNORE INTO sync_state (id, last_seq, compacted_through) VALUES (1, 0, 0)"
+        ))
+        conn.execute(text(
+            "UPDATE sync_state SET last_seq = MAX(last_seq, "
+            "(SELECT COALESCE(MAX(change_seq), 0) FROM scorecards)) WHERE id = 1"
+        ))
+
+migrate_change_feed()
+
+def load_metrics(raw: dict) -> Metrics:
+    """
+    Rebuilds Metrics from a stored raw_metrics blob. Rows in the
+    dimensional format were validated when written and are not checked
+    again here; legacy rows go through the MetricsInput adapter.
+    """
+    if "values" in raw:
+        return Metrics.model_construct(brands=raw["brands"], values=raw["values"])
+    return Metrics(**raw)
+
 # =========================
 # CORS (PRODUCTION SAFE)
 # =========================
@@ -65,69 +110,122 @@ def get_db():
     finally:
         db.close()
 
+# =========================
+# Change Feed
+# =========================
+# Cursors not seen for this long stop holding back tombstone compaction;
+# the client gets reset=true on its next sync instead
+CURSOR_TTL = timedelta(days=30)
+
+def next_change_seq(db: Session) -> int:
+    """
+    Hands out the next change sequence number. The UPDATE takes the SQLite
+    write lock first, so concurrent writers never share a number.
+    """
+    db.query(SyncStateDB).filter(SyncStateDB.id == 1).update(
+        {SyncStateDB.last_seq: SyncStateDB.last_seq + 1}
+    )
+    return db.query(SyncStateDB.last_seq).filter(SyncStateDB.id == 1).scalar()
+
+def compact_tombstones(db: Session, state: SyncStateDB) -> None:
+    """
+    Removes tombstones that every live cursor has already synced past.
+    Cursors idle for longer than CURSOR_TTL are dropped first.
+    Does nothing until at least one client has registered a cursor.
+    """
+    db.query(SyncCursorDB).filter(
+        SyncCursorDB.updated_at < datetime.utcnow() - CURSOR_TTL,
+    ).delete(synchronize_session=False)
+
+    oldest = db.query(func.min(SyncCursorDB.last_seq)).scalar()
+    if oldest is None or oldest <= state.compacted_through:
+        return
+
+    db.query(ScorecardDB).filter(
+        ScorecardDB.deleted_at.isnot(None),
+        ScorecardDB.change_seq <= oldest,
+    ).delete(synchronize_session=False)
+    state.compacted_through = oldest
+
+def migrate_metric_arrays():
+    """
+    Rewrites live rows stored with MetricsInput fields into the compact
+    per-metric array format. Each rewritten row gets a new change_seq so
+    synced clients pick it up. Rows that fail validation are left alone.
+    """
+    db = SessionLocal()
+    try:
+        items = db.query(ScorecardDB).filter(
+            ScorecardDB.deleted_at.is_(None),
+            ScorecardDB.raw_metrics.isnot(None),
+            text("json_extract(raw_metrics, '$.values') IS NULL"),
+        ).all()
+        for item in items:
+            try:
+                metrics = Metrics(**item.raw_metrics)
+            except (TypeError, ValidationError) as e:
+                logger.warning("Skipping scorecard %s, bad raw_metrics: %s", item.id, e)
+                continue
+            item.raw_metrics = metrics.model_dump()
+            flag_modified(item, "raw_metrics")
+            item.change_seq = next_change_seq(db)
+        db.commit()
+    finally:
+        db.close()
+
+migrate_metric_arrays()
+
+def metric_views(metrics: Metrics, dimensional: bool = False) -> dict:
+    """
+    The metrics/metric_values pair for a response. The dimensional view
+    is only sent when asked for or when there is no named-field view.
+    """
+    legacy = metrics.to_legacy()
+    return {
+        "metrics": legacy,
+        "metric_values": metrics if dimensional or legacy is None else None,
+    }
+
+def to_response(i: ScorecardDB, dimensional: bool = False) -> ScorecardResponse:
+    metrics = load_metrics(i.raw_metrics)
+    return ScorecardResponse(
+        id=i.id,
+        manager_name=i.manager_name,
+        mall_name=i.mall_name,
+        month=i.month,
+        created_at=i.created_at,
+        total_score=i.total_score,
+        breakdown=Breakdown(**i.breakdown),
+        **metric_views(metrics, dimensional),
+        change_seq=i.change_seq,
+    )
+
 # =========================
 # Logic
 # =========================
-def calculate_breakdown(m: MetricsInput) -> Breakdown:
+def calculate_breakdown(m: Metrics) -> Breakdown:
+    v = m.values
     return Breakdown(
-        google_score=logic.calculate_google_rating_score(
-            m.google_rating_amritsari,
-            m.google_rating_chennai,
-            m.google_rating_chaat_masala,
+        google_score=logic.calculate_rating_score(
+            dimensions.series(v, "rating", "google"),
         ),
-        zomato_swiggy_score=logic.calculate_zomato_swiggy_score([
-            m.zomato_rating_amritsari,
-            m.swiggy_rating_amritsari,
-            m.zomato_rating_chennai,
-            m.swiggy_rating_chennai,
-            m.zomato_rating_chaat_masala,
-            m.swiggy_rating_chaat_masala,
-        ]),
-        food_cost_score=logic.calculate_food_cost_score(
-            m.food_cost_amritsari,
-            m.food_cost_chennai,
-            m.food_cost_chaat_masala,
+        zomato_swiggy_score=logic.calculate_zomato_swiggy_score(
+            dimensions.series(v, "rating", "zomato", "swiggy"),
         ),
-        online_activity_score=logic.calculate_online_activity_score([
-            m.online_activity_amritsari_zomato,
-            m.online_activity_amritsari_swiggy,
-            m.online_activity_chennai_zomato,
-            m.online_activity_chennai_swiggy,
-            m.online_activity_chaat_masala_zomato,
-            m.online_activity_chaat_masala_swiggy,
-        ]),
-        kitchen_prep_score=logic.calculate_kitchen_prep_score([
-            m.kitchen_prep_amritsari_zomato,
-            m.kitchen_prep_amritsari_swiggy,
-            m.kitchen_prep_chennai_zomato,
-            m.kitchen_prep_chennai_swiggy,
-            m.kitchen_prep_chaat_masala_zomato,
-            m.kitchen_prep_chaat_masala_swiggy,
-        ]),
-        bad_delay_score=logic.calculate_bad_delay_score(
-            [
-                m.bad_order_amritsari_zomato,
-                m.bad_order_chennai_zomato,
-                m.bad_order_chaat_masala_zomato,
-            ],
-            [
-                m.delay_order_amritsari_swiggy,
-                m.delay_order_chennai_swiggy,
-                m.delay_order_chaat_masala_swiggy,
-            ],
+        food_cost_score=logic.calculate_brand_food_cost_score(
+            m.brands,
+            v["food_cost"],
         ),
-        outlet_audit_score=logic.calculate_outlet_audit_score(
-            m.mistakes_amritsari,
-            m.mistakes_chennai,
-            m.mistakes_chaat_masala,
+        online_activity_score=logic.calculate_online_activity_score(v["online_activity"]),
+        kitchen_prep_score=logic.calculate_kitchen_prep_score(v["kitchen_prep"]),
+        bad_delay_score=logic.calculate_bad_delay_score(
+            v["bad_order"],
+            v["delay_order"],
         ),
-        add_on_sale_score=logic.calculate_add_on_sale_score(
-            m.total_sale_amritsari,
-            m.add_on_sale_amritsari,
-            m.total_sale_chennai,
-            m.add_on_sale_chennai,
-            m.total_sale_chaat_masala,
-            m.add_on_sale_chaat_masala,
+        outlet_audit_score=logic.calculate_audit_score(v["mistakes"]),
+        add_on_sale_score=logic.calculate_add_on_score(
+            v["total_sale"],
+            v["add_on_sale"],
         ),
     )
 
@@ -146,7 +244,7 @@ def calculate_only(data: ScorecardCreate):
         created_at=datetime.utcnow(),
         total_score=total,
         breakdown=bd,
-        metrics=data.metrics,
+        **metric_views(data.metrics),
     )
 
 @app.post("/scorecards", response_model=ScorecardResponse)
@@ -165,30 +263,23 @@ def create_scorecard(
         total_score=total,
         raw_metrics=data.metrics.model_dump(),
         breakdown=bd.model_dump(),
+        change_seq=next_change_seq(db),
     )
 
     db.add(db_item)
     db.commit()
     db.refresh(db_item)
 
-    return ScorecardResponse(
-        id=db_item.id,
-        manager_name=db_item.manager_name,
-        mall_name=db_item.mall_name,
-        month=db_item.month,
-        created_at=db_item.created_at,
-        total_score=db_item.total_score,
-        breakdown=Breakdown(**db_item.breakdown),
-        metrics=MetricsInput(**db_item.raw_metrics),
-    )
+    return to_response(db_item)
 
 @app.get("/scorecards", response_model=List[ScorecardResponse])
 def get_scorecards(
     month: str = Query(None),
     year: str = Query(None),
+    dimensional: bool = Query(False),
     db: Session = Depends(get_db),
 ):
-    query = db.query(ScorecardDB)
+    query = db.query(ScorecardDB).filter(ScorecardDB.deleted_at.is_(None))
 
     if month and year:
         query = query.filter(ScorecardDB.month == f"{month} {year}")
@@ -199,24 +290,13 @@ def get_scorecards(
 
     items = query.all()
 
-    return [
-        ScorecardResponse(
-            id=i.id,
-            manager_name=i.manager_name,
-            mall_name=i.mall_name,
-            month=i.month,
-            created_at=i.created_at,
-            total_score=i.total_score,
-            breakdown=Breakdown(**i.breakdown),
-            metrics=MetricsInput(**i.raw_metrics),
-        )
-        for i in items
-    ]
+    return [to_response(i, dimensional) for i in items]
 
 @app.get("/leaderboard", response_model=List[ScorecardResponse])
 def get_leaderboard(
     month: str = Query(None),
     year: str = Query(None),
+    dimensional: bool = Query(False),
     db: Session = Depends(get_db),
 ):
     """
@@ -225,7 +305,7 @@ def get_leaderboard(
     Never deletes or hides old records.
     """
     try:
-        query = db.query(ScorecardDB)
+        query = db.query(ScorecardDB).filter(ScorecardDB.deleted_at.is_(None))
 
         if month and year:
             query = query.filter(ScorecardDB.month == f"{month} {year}")
@@ -237,41 +317,103 @@ def get_leaderboard(
         # Sort by score descending on the DB side (uses the index)
         items = query.order_by(ScorecardDB.total_score.desc()).all()
 
-        return [
-            ScorecardResponse(
-                id=i.id,
-                manager_name=i.manager_name,
-                mall_name=i.mall_name,
-                month=i.month,
-                created_at=i.created_at,
-                total_score=i.total_score,
-                breakdown=Breakdown(**i.breakdown),
-                metrics=MetricsInput(**i.raw_metrics),
-            )
-            for i in items
-        ]
+        return [to_response(i, dimensional) for i in items]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @app.delete("/scorecards/{id}")
 def delete_scorecard(id: int, db: Session = Depends(get_db)):
-    item = db.query(ScorecardDB).filter(ScorecardDB.id == id).first()
+    item = db.query(ScorecardDB).filter(
+        ScorecardDB.id == id,
+        ScorecardDB.deleted_at.is_(None),
+    ).first()
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
 
-    db.delete(item)
+    # Keep a tombstone so synced clients learn about the delete
+    item.deleted_at = datetime.utcnow()
+    item.change_seq = next_change_seq(db)
     db.commit()
     return {"ok": True}
 
+@app.get("/changes", response_model=ChangesResponse)
+def get_changes(
+    since: int = Query(0, ge=0),
+    client_id: str = Query(None),
+    dimensional: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    """
+    Returns scorecards inserted or deleted after the `since` cursor.
+    Passing a client_id records `since` as that client's cursor so tombstones
+    it has already seen can be compacted.
+    """
+    state = db.query(SyncStateDB).filter(SyncStateDB.id == 1).one()
+    latest = state.last_seq
+
+    def changed_rows(reset: bool) -> List[ScorecardDB]:
+        query = db.query(ScorecardDB).filter(ScorecardDB.change_seq <= latest)
+        if reset:
+            query = query.filter(ScorecardDB.deleted_at.is_(None))
+        else:
+            query = query.filter(ScorecardDB.change_seq > since)
+        return query.order_by(ScorecardDB.change_seq).all()
+
+    # Tombstones the client needs may already be gone, or the client is ahead
+    # of this database (restored or recreated); either way do a full sync
+    reset = since < state.compacted_through or since > latest
+    items = changed_rows(reset)
+
+    # The reads above are separate snapshots. If another request compacted
+    # tombstones past `since` in between, deletes may be missing from items.
+    if not reset:
+        db.refresh(state)
+        if since < state.compacted_through:
+            reset = True
+            items = changed_rows(reset)
+
+    response = ChangesResponse(
+        latest_seq=latest,
+        reset=reset,
+        upserts=[to_response(i, dimensional) for i in items if i.deleted_at is None],
+        deleted=[i.id for i in items if i.deleted_at is not None],
+    )
+
+    if client_id:
+        cursor = db.query(SyncCursorDB).filter(SyncCursorDB.client_id == client_id).first()
+        if cursor is None:
+            cursor = SyncCursorDB(client_id=client_id)
+            db.add(cursor)
+        cursor.last_seq = min(since, latest)
+        cursor.updated_at = datetime.utcnow()
+        db.flush()
+        compact_tombstones(db, state)
+        db.commit()
+
+    return response
+
 @app.get("/export/{id}")
 def export_excel(id: int, db: Session = Depends(get_db)):
-    item = db.query(ScorecardDB).filter(ScorecardDB.id == id).first()
+    item = db.query(ScorecardDB).filter(
+        ScorecardDB.id == id,
+        ScorecardDB.deleted_at.is_(None),
+    ).first()
     if not item:
         raise HTTPException(status_code=404, detail="Not found")
 
-    metrics = MetricsInput(**item.raw_metrics)
+    metrics = load_metrics(item.raw_metrics)
+    v = metrics.values
     bd = Breakdown(**item.breakdown)
 
+    def per_brand(cell) -> str:
+        return ", ".join(
+            f"{dimensions.BRANDS[brand]['label']}: {cell(n)}"
+            for n, brand in enumerate(metrics.brands)
+        )
+
+    google = dimensions.series(v, "rating", "google")
+    delivery = dimensions.series(v, "rating", "zomato", "swiggy")
+
     wb = openpyxl.Workbook()
     ws = wb.active
     ws.title = "Scorecard"
@@ -283,14 +425,14 @@ def export_excel(id: int, db: Session = Depends(get_db)):
     ws.append(["Total Score", item.total_score, ""])
     ws.append(["", "", ""])
 
-    ws.append(["Google Rating", f"A: {metrics.google_rating_amritsari}, C: {metrics.google_rating_chennai}, CM: {metrics.google_rating_chaat_masala}", bd.google_score])
-    ws.append(["Zomato/Swiggy", "(Avg of 6 ratings)", bd.zomato_swiggy_score])
-    ws.append(["Food Cost", f"A: {metrics.food_cost_amritsari}%, C: {metrics.food_cost_chennai}%, CM: {metrics.food_cost_chaat_masala}%", bd.food_cost_score])
-    ws.append(["Online Activity", "(Avg of 6%)", bd.online_activity_score])
-    ws.append(["Kitchen Prep", "(Avg of 6 times)", bd.kitchen_prep_score])
+    ws.append(["Google Rating", per_brand(lambda n: google[n]), bd.google_score])
+    ws.append(["Zomato/Swiggy", f"(Avg of {len(delivery)} ratings)", bd.zomato_swiggy_score])
+    ws.append(["Food Cost", per_brand(lambda n: f"{v['food_cost'][n]}%"), bd.food_cost_score])
+    ws.append(["Online Activity", f"(Avg of {len(v['online_activity'])}%)", bd.online_activity_score])
+    ws.append(["Kitchen Prep", f"(Avg of {len(v['kitchen_prep'])} times)", bd.kitchen_prep_score])
     ws.append(["Bad & Delay", "(Combined Score - Zomato Bad, Swiggy Delay)", bd.bad_delay_score])
-    ws.append(["Outlet Audit", f"A: {metrics.mistakes_amritsari}, C: {metrics.mistakes_chennai}, CM: {metrics.mistakes_chaat_masala}", bd.outlet_audit_score])
-    ws.append(["Add On Sale", f"A: {metrics.add_on_sale_amritsari}/{metrics.total_sale_amritsari}, C: {metrics.add_on_sale_chennai}/{metrics.total_sale_chennai}, CM: {metrics.add_on_sale_chaat_masala}/{metrics.total_sale_chaat_masala}", bd.add_on_sale_score])
+    ws.append(["Outlet Audit", per_brand(lambda n: f"{v['mistakes'][n]:g}"), bd.outlet_audit_score])
+    ws.append(["Add On Sale", per_brand(lambda n: f"{v['add_on_sale'][n]}/{v['total_sale'][n]}"), bd.add_on_sale_score])
 
     handle, path = tempfile.mkstemp(suffix=".xlsx")
     os.close(handle)
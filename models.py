@@ -1,9 +1,11 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Optional
 from datetime import datetime
 from sqlalchemy import Column, Integer, String, Float, JSON, DateTime
 from sqlalchemy.ext.declarative import declarative_base
 
+import dimensions
+
 Base = declarative_base()
 
 # SQLAlchemy Database Model
@@ -18,10 +20,32 @@ class ScorecardDB(Base):
     
     total_score = Column(Float, index=True)
     
-    # Store complex data as JSON
+    # Store complex data as JSON. raw_metrics holds Metrics
+    # ({"brands": [...], "values": {metric: [...]}}); rows written before
+    # the dimensional model hold MetricsInput fields instead.
     raw_metrics = Column(JSON)
     breakdown = Column(JSON)
 
+    # Change feed: bumped on every write, deleted rows are kept as tombstones
+    change_seq = Column(Integer, index=True)
+    deleted_at = Column(DateTime, nullable=True)
+
+class SyncStateDB(Base):
+    __tablename__ = "sync_state"
+
+    id = Column(Integer, primary_key=True)
+    # Highest change_seq handed out so far
+    last_seq = Column(Integer, nullable=False, default=0)
+    # Tombstones with change_seq <= this have been compacted away
+    compacted_through = Column(Integer, nullable=False, default=0)
+
+class SyncCursorDB(Base):
+    __tablename__ = "sync_cursors"
+
+    client_id = Column(String, primary_key=True)
+    last_seq = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 # Pydantic Models for API
 class MetricsInput(BaseModel):
     # Google Ratings
@@ -80,11 +104,68 @@ class MetricsInput(BaseModel):
     total_sale_chaat_masala: float
     add_on_sale_chaat_masala: float
 
+    def to_metrics(self) -> "Metrics":
+        return Metrics(
+            brands=list(dimensions.LEGACY_BRANDS),
+            values=dimensions.from_legacy(self.model_dump()),
+        )
+
+class Metrics(BaseModel):
+    """
+    Dimensional metrics: one numeric array per metric, laid out
+    brand-major over the platforms in dimensions.METRIC_PLATFORMS.
+    MetricsInput-shaped payloads are accepted and converted.
+    """
+    brands: List[str] = Field(min_length=1)
+    values: Dict[str, List[float]]
+
+    @model_validator(mode="before")
+    @classmethod
+    def adapt_legacy(cls, data):
+        if isinstance(data, MetricsInput):
+            return data.to_metrics().model_dump()
+        if isinstance(data, dict) and "brands" not in data and "values" not in data:
+            return MetricsInput(**data).to_metrics().model_dump()
+        return data
+
+    @model_validator(mode="after")
+    def check_shape(self):
+        for metric in self.values:
+            if metric not in dimensions.METRIC_PLATFORMS:
+                raise ValueError(f"Unknown metric: {metric}")
+        for brand in self.brands:
+            if brand not in dimensions.BRANDS:
+                raise ValueError(f"Unknown brand: {brand}")
+        if len(set(self.brands)) != len(self.brands):
+            raise ValueError("Duplicate brands")
+        for metric in dimensions.METRIC_PLATFORMS:
+            expected = len(self.brands) * dimensions.metric_width(metric)
+            if len(self.values.get(metric, [])) != expected:
+                raise ValueError(f"{metric} needs {expected} values")
+        for metric in dimensions.INTEGER_METRICS:
+            if any(not float(v).is_integer() for v in self.values.get(metric, [])):
+                raise ValueError(f"{metric} must be whole numbers")
+        return self
+
+    def to_legacy(self) -> Optional[dict]:
+        """
+        Named-field (MetricsInput) dict, or None when the brands are not
+        LEGACY_BRANDS or a stored count is fractional (saved before counts
+        were checked). Left as a dict so ScorecardResponse validates it in
+        the same pass as the rest of the row.
+        """
+        if self.brands != dimensions.LEGACY_BRANDS:
+            return None
+        for metric in dimensions.INTEGER_METRICS:
+            if any(not float(v).is_integer() for v in self.values[metric]):
+                return None
+        return dimensions.to_legacy(self.values)
+
 class ScorecardCreate(BaseModel):
     manager_name: str
     mall_name: str
     month: str
-    metrics: MetricsInput
+    metrics: Metrics
 
 class Breakdown(BaseModel):
     google_score: int
@@ -104,8 +185,22 @@ class ScorecardResponse(BaseModel):
     created_at: datetime
     total_score: float
     breakdown: Breakdown
-    metrics: MetricsInput
+    # Named-field view, only present for the legacy brand set
+    metrics: Optional[MetricsInput] = None
+    # Dimensional view, present when asked for or when there is no
+    # named-field view
+    metric_values: Optional[Metrics] = None
+    change_seq: Optional[int] = None
 
     class Config:
         from_attributes = True
 
+class ChangesResponse(BaseModel):
+    # Cursor to pass as `since` on the next call
+    latest_seq: int
+    # True when `since` is older than compacted tombstones; the client must
+    # drop its cache and replace it with `upserts`
+    reset: bool = False
+    upserts: List[ScorecardResponse]
+    deleted: List[int]
+
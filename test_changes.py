@@ -0,0 +1,186 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Point the app at a scratch database before main creates its engine
+# (always overridden, the suite drops tables and must never see a real one)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+from models import Base, ScorecardDB, SyncCursorDB, SyncStateDB
+from test_dimensions import legacy_payload
+
+
+class TestChangeFeed(unittest.TestCase):
+
+    def setUp(self):
+        Base.metadata.drop_all(bind=main.engine)
+        Base.metadata.create_all(bind=main.engine)
+        main.migrate_change_feed()
+        self.client = TestClient(main.app)
+
+    def create(self, name="m"):
+        r = self.client.post("/scorecards", json={
+            "manager_name": name,
+            "mall_name": "mall",
+            "month": "January 2026",
+            "metrics": legacy_payload(),
+        })
+        self.assertEqual(r.status_code, 200)
+        return r.json()
+
+    def changes(self, since, client_id=None):
+        params = {"since": since}
+        if client_id:
+            params["client_id"] = client_id
+        r = self.client.get("/changes", params=params)
+        self.assertEqual(r.status_code, 200)
+        return r.json()
+
+    def row_count(self):
+        db = main.SessionLocal()
+        try:
+            return db.query(ScorecardDB).count()
+        finally:
+            db.close()
+
+    def test_upserts_and_deletes_after_since(self):
+        a = self.create("a")
+        b = self.create("b")
+        self.assertEqual((a["change_seq"], b["change_seq"]), (1, 2))
+
+        r = self.changes(0)
+        self.assertEqual(r["latest_seq"], 2)
+        self.assertFalse(r["reset"])
+        self.assertEqual([u["id"] for u in r["upserts"]], [a["id"], b["id"]])
+
+        self.client.delete(f"/scorecards/{a['id']}")
+        c = self.create("c")
+
+        r = self.changes(2)
+        self.assertEqual(r["latest_seq"], 4)
+        self.assertEqual([u["id"] for u in r["upserts"]], [c["id"]])
+        self.assertEqual(r["deleted"], [a["id"]])
+
+        self.assertEqual(self.changes(4)["upserts"], [])
+
+    def test_delete_is_soft_and_hidden(self):
+        a = self.create()
+        self.assertEqual(self.client.delete(f"/scorecards/{a['id']}").status_code, 200)
+        self.assertEqual(self.client.delete(f"/scorecards/{a['id']}").status_code, 404)
+        self.assertEqual(self.client.get(f"/export/{a['id']}").status_code, 404)
+        self.assertEqual(self.client.get("/scorecards").json(), [])
+        self.assertEqual(self.client.get("/leaderboard").json(), [])
+        # Tombstone is still stored
+        self.assertEqual(self.row_count(), 1)
+
+    def test_compaction_waits_for_every_cursor(self):
+        a = self.create()
+        self.client.delete(f"/scorecards/{a['id']}")
+
+        self.changes(0, client_id="slow")
+        self.changes(2, client_id="fast")
+        # "slow" has not seen the delete yet
+        self.assertEqual(self.row_count(), 1)
+
+        self.changes(2, client_id="slow")
+        self.assertEqual(self.row_count(), 0)
+
+    def test_stale_cursor_gets_reset(self):
+        a = self.create("a")
+        b = self.create("b")
+        self.client.delete(f"/scorecards/{a['id']}")
+        self.changes(3, client_id="x")
+
+        r = self.changes(1)
+        self.assertTrue(r["reset"])
+        self.assertEqual([u["id"] for u in r["upserts"]], [b["id"]])
+        self.assertEqual(r["deleted"], [])
+
+        self.assertFalse(self.changes(3)["reset"])
+
+    def test_cursor_ahead_of_server_gets_reset(self):
+        a = self.create()
+        r = self.changes(999)
+        self.assertTrue(r["reset"])
+        self.assertEqual(r["latest_seq"], 1)
+        self.assertEqual([u["id"] for u in r["upserts"]], [a["id"]])
+
+    def test_compaction_between_reads_forces_reset(self):
+        a = self.create("a")
+        b = self.create("b")
+        self.client.delete(f"/scorecards/{a['id']}")
+        self.changes(0, client_id="other")
+
+        def compact_once(conn, cursor, statement, *args):
+            # Another request compacts right before the rows are read
+            if "FROM scorecards" not in statement or fired:
+                return
+            fired.append(True)
+            db = main.SessionLocal()
+            try:
+                db.query(SyncCursorDB).update({SyncCursorDB.last_seq: 3})
+                main.compact_tombstones(db, db.query(SyncStateDB).one())
+                db.commit()
+            finally:
+                db.close()
+
+        fired = []
+        event.listen(main.engine, "before_cursor_execute", compact_once)
+        try:
+            r = self.changes(1)
+        finally:
+            event.remove(main.engine, "before_cursor_execute", compact_once)
+
+        self.assertTrue(fired)
+        self.assertEqual(self.row_count(), 1)
+        self.assertTrue(r["reset"])
+        self.assertEqual([u["id"] for u in r["upserts"]], [b["id"]])
+
+    def test_expired_cursor_does_not_block_compaction(self):
+        a = self.create()
+        self.client.delete(f"/scorecards/{a['id']}")
+        self.changes(0, client_id="gone")
+
+        db = main.SessionLocal()
+        try:
+            db.query(SyncCursorDB).update({
+                SyncCursorDB.updated_at: datetime.utcnow() - main.CURSOR_TTL - timedelta(days=1),
+            })
+            db.commit()
+        finally:
+            db.close()
+
+        self.changes(2, client_id="active")
+        self.assertEqual(self.row_count(), 0)
+
+    def test_rows_past_latest_seq_are_excluded(self):
+        self.create()
+        # A row whose sequence was handed out after /changes read latest_seq
+        db = main.SessionLocal()
+        try:
+            latest = db.query(SyncStateDB.last_seq).scalar()
+            db.add(ScorecardDB(
+                month="January 2026",
+                manager_name="late",
+                mall_name="mall",
+                total_score=0,
+                raw_metrics={},
+                breakdown={},
+                change_seq=latest + 1,
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+        r = self.changes(0)
+        self.assertEqual(r["latest_seq"], 1)
+        self.assertEqual([u["manager_name"] for u in r["upserts"]], ["m"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from dimensions import (
+    BRANDS,
+    LEGACY_BRANDS,
+    PLATFORMS,
+    METRIC_PLATFORMS,
+    metric_width,
+    series,
+    legacy_key,
+    from_legacy,
+    to_legacy,
+)
+from models import MetricsInput
+
+def legacy_payload():
+    # Every MetricsInput field with a distinct value
+    flat = {}
+    n = 0
+    for metric, platforms in METRIC_PLATFORMS.items():
+        for brand in LEGACY_BRANDS:
+            for platform in platforms or [None]:
+                n += 1
+                flat[legacy_key(metric, brand, platform)] = float(n)
+    return flat
+
+class TestDimensions(unittest.TestCase):
+
+    def test_legacy_keys(self):
+        self.assertEqual(legacy_key("rating", "chennai", "google"), "google_rating_chennai")
+        self.assertEqual(legacy_key("rating", "amritsari", "swiggy"), "swiggy_rating_amritsari")
+        self.assertEqual(legacy_key("food_cost", "chaat_masala"), "food_cost_chaat_masala")
+        self.assertEqual(legacy_key("bad_order", "chennai", "zomato"), "bad_order_chennai_zomato")
+
+    def test_covers_all_legacy_fields(self):
+        self.assertEqual(set(legacy_payload()), set(MetricsInput.model_fields))
+
+    def test_layout_uses_known_platforms(self):
+        for platforms in METRIC_PLATFORMS.values():
+            for platform in platforms or []:
+                self.assertIn(platform, PLATFORMS)
+
+    def test_legacy_brands_are_registered(self):
+        for brand in LEGACY_BRANDS:
+            self.assertIn(brand, BRANDS)
+
+    def test_round_trip(self):
+        flat = legacy_payload()
+        values = from_legacy(flat)
+        for metric, arr in values.items():
+            self.assertEqual(len(arr), len(LEGACY_BRANDS) * metric_width(metric))
+        self.assertEqual(to_legacy(values), flat)
+
+    def test_series(self):
+        flat = legacy_payload()
+        values = from_legacy(flat)
+        self.assertEqual(
+            series(values, "rating", "google"),
+            [flat[f"google_rating_{b}"] for b in LEGACY_BRANDS],
+        )
+        # Brand-major, matching the order scoring used before
+        self.assertEqual(
+            series(values, "rating", "zomato", "swiggy"),
+            [flat[f"{p}_rating_{b}"] for b in LEGACY_BRANDS for p in ("zomato", "swiggy")],
+        )
+        self.assertEqual(series(values, "mistakes"), values["mistakes"])
+
+if __name__ == '__main__':
+    unittest.main()
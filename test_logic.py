@@ -7,8 +7,13 @@ from logic import (
     calculate_kitchen_prep_score,
     calculate_bad_delay_score,
     calculate_outlet_audit_score,
-    calculate_add_on_sale_score
+    calculate_add_on_sale_score,
+    calculate_rating_score,
+    calculate_brand_food_cost_score,
+    calculate_audit_score,
+    calculate_add_on_score,
 )
+from dimensions import BRANDS
 
 class TestScoringLogic(unittest.TestCase):
     
@@ -79,5 +84,19 @@ class TestScoringLogic(unittest.TestCase):
         # Case 2: Mixed. A=16%(12), C=10%(0), CM=15%(10). Avg=(12+0+10)/3 = 22/3 = 7.333
         self.assertAlmostEqual(calculate_add_on_sale_score(100, 16, 100, 10, 100, 15), 22/3)
 
+    def test_generic_over_brand_counts(self):
+        # Generic forms take any number of outlets
+        self.assertEqual(calculate_rating_score([4.0, 3.8]), 9)
+        self.assertEqual(calculate_rating_score([]), 0)
+        self.assertEqual(calculate_audit_score([0, 10]), 10)
+        self.assertEqual(calculate_add_on_score([100, 100], [16, 15]), 11)
+        # Chennai at 22% scores 5, Amritsari at 22% scores 10
+        self.assertEqual(calculate_brand_food_cost_score(["chennai"], [22]), 5)
+        self.assertEqual(calculate_brand_food_cost_score(["amritsari", "chennai"], [22, 22]), 15)
+
+    def test_every_brand_has_food_cost_bands(self):
+        for brand in BRANDS:
+            self.assertTrue(BRANDS[brand]["food_cost_bands"])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,200 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+# Point the app at a scratch database before main creates its engine
+# (always overridden, the suite drops tables and must never see a real one)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+
+from pydantic import ValidationError
+
+import logic
+import main
+from models import Base, Breakdown, Metrics, MetricsInput, ScorecardDB
+from test_dimensions import legacy_payload
+
+SAMPLE = {
+    "google_rating_amritsari": 4.0, "google_rating_chennai": 4.0, "google_rating_chaat_masala": 3.8,
+    "zomato_rating_amritsari": 4.0, "swiggy_rating_amritsari": 3.9,
+    "zomato_rating_chennai": 3.7, "swiggy_rating_chennai": 4.1,
+    "zomato_rating_chaat_masala": 3.9, "swiggy_rating_chaat_masala": 3.8,
+    "food_cost_amritsari": 23.0, "food_cost_chennai": 21.5, "food_cost_chaat_masala": 29.0,
+    "online_activity_amritsari_zomato": 99.0, "online_activity_amritsari_swiggy": 96.0,
+    "online_activity_chennai_zomato": 98.0, "online_activity_chennai_swiggy": 97.0,
+    "online_activity_chaat_masala_zomato": 95.5, "online_activity_chaat_masala_swiggy": 99.0,
+    "kitchen_prep_amritsari_zomato": 15.0, "kitchen_prep_amritsari_swiggy": 16.0,
+    "kitchen_prep_chennai_zomato": 17.0, "kitchen_prep_chennai_swiggy": 15.0,
+    "kitchen_prep_chaat_masala_zomato": 18.0, "kitchen_prep_chaat_masala_swiggy": 14.0,
+    "bad_order_amritsari_zomato": 5.0, "bad_order_chennai_zomato": 6.0, "bad_order_chaat_masala_zomato": 8.0,
+    "delay_order_amritsari_swiggy": 4.0, "delay_order_chennai_swiggy": 9.0, "delay_order_chaat_masala_swiggy": 18.0,
+    "mistakes_amritsari": 2, "mistakes_chennai": 3, "mistakes_chaat_masala": 7,
+    "total_sale_amritsari": 2300000.0, "add_on_sale_amritsari": 100000.0,
+    "total_sale_chennai": 200000.0, "add_on_sale_chennai": 38000.0,
+    "total_sale_chaat_masala": 120000.0, "add_on_sale_chaat_masala": 15600.0,
+}
+
+def named_field_breakdown(m: MetricsInput) -> Breakdown:
+    # Scoring as it was done from MetricsInput fields before the dimensional model
+    return Breakdown(
+        google_score=logic.calculate_google_rating_score(
+            m.google_rating_amritsari, m.google_rating_chennai, m.google_rating_chaat_masala,
+        ),
+        zomato_swiggy_score=logic.calculate_zomato_swiggy_score([
+            m.zomato_rating_amritsari, m.swiggy_rating_amritsari,
+            m.zomato_rating_chennai, m.swiggy_rating_chennai,
+            m.zomato_rating_chaat_masala, m.swiggy_rating_chaat_masala,
+        ]),
+        food_cost_score=logic.calculate_food_cost_score(
+            m.food_cost_amritsari, m.food_cost_chennai, m.food_cost_chaat_masala,
+        ),
+        online_activity_score=logic.calculate_online_activity_score([
+            m.online_activity_amritsari_zomato, m.online_activity_amritsari_swiggy,
+            m.online_activity_chennai_zomato, m.online_activity_chennai_swiggy,
+            m.online_activity_chaat_masala_zomato, m.online_activity_chaat_masala_swiggy,
+        ]),
+        kitchen_prep_score=logic.calculate_kitchen_prep_score([
+            m.kitchen_prep_amritsari_zomato, m.kitchen_prep_amritsari_swiggy,
+            m.kitchen_prep_chennai_zomato, m.kitchen_prep_chennai_swiggy,
+            m.kitchen_prep_chaat_masala_zomato, m.kitchen_prep_chaat_masala_swiggy,
+        ]),
+        bad_delay_score=logic.calculate_bad_delay_score(
+            [m.bad_order_amritsari_zomato, m.bad_order_chennai_zomato, m.bad_order_chaat_masala_zomato],
+            [m.delay_order_amritsari_swiggy, m.delay_order_chennai_swiggy, m.delay_order_chaat_masala_swiggy],
+        ),
+        outlet_audit_score=logic.calculate_outlet_audit_score(
+            m.mistakes_amritsari, m.mistakes_chennai, m.mistakes_chaat_masala,
+        ),
+        add_on_sale_score=logic.calculate_add_on_sale_score(
+            m.total_sale_amritsari, m.add_on_sale_amritsari,
+            m.total_sale_chennai, m.add_on_sale_chennai,
+            m.total_sale_chaat_masala, m.add_on_sale_chaat_masala,
+        ),
+    )
+
+def dimensional_payload():
+    return Metrics(**SAMPLE).model_dump()
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_breakdown_matches_named_field_scoring(self):
+        m = MetricsInput(**SAMPLE)
+        self.assertEqual(main.calculate_breakdown(m.to_metrics()), named_field_breakdown(m))
+
+    def test_adapts_legacy_payload(self):
+        from_dict = Metrics(**SAMPLE)
+        from_model = Metrics.model_validate(MetricsInput(**SAMPLE))
+        self.assertEqual(from_dict, from_model)
+        self.assertEqual(from_dict.brands, ["amritsari", "chennai", "chaat_masala"])
+        self.assertEqual(from_dict.values["mistakes"], [2, 3, 7])
+        self.assertEqual(MetricsInput(**from_dict.to_legacy()), MetricsInput(**SAMPLE))
+
+    def test_dimensional_payload_missing_values(self):
+        with self.assertRaises(ValidationError) as ctx:
+            Metrics(brands=["chennai"])
+        self.assertEqual([e["loc"] for e in ctx.exception.errors()], [("values",)])
+
+    def test_legacy_payload_missing_field(self):
+        data = dict(SAMPLE)
+        del data["food_cost_chennai"]
+        with self.assertRaises(ValidationError):
+            Metrics(**data)
+
+    def test_rejects_bad_shapes(self):
+        cases = {
+            "unknown brand": lambda d: d["brands"].__setitem__(0, "pizza"),
+            "duplicate brand": lambda d: d["brands"].__setitem__(1, "amritsari"),
+            "short array": lambda d: d["values"]["rating"].pop(),
+            "missing metric": lambda d: d["values"].pop("food_cost"),
+            "unknown metric": lambda d: d["values"].__setitem__("footfall", [1, 2, 3]),
+            "fractional count": lambda d: d["values"]["mistakes"].__setitem__(0, 2.5),
+            "no brands": lambda d: d.update(brands=[], values={}),
+            "no brands, empty arrays": lambda d: d.update(
+                brands=[], values={metric: [] for metric in d["values"]},
+            ),
+        }
+        for name, mutate in cases.items():
+            with self.subTest(name):
+                data = dimensional_payload()
+                mutate(data)
+                with self.assertRaises(ValidationError):
+                    Metrics(**data)
+
+    def test_to_legacy_needs_legacy_brands(self):
+        data = dimensional_payload()
+        # Same three brands in another order have no named-field view
+        data["brands"] = ["chennai", "amritsari", "chaat_masala"]
+        self.assertIsNone(Metrics(**data).to_legacy())
+
+        data = Metrics(**legacy_payload()).model_dump()
+        data["brands"] = ["amritsari", "chennai"]
+        for metric, arr in data["values"].items():
+            del arr[len(arr) * 2 // 3:]
+        m = Metrics(**data)
+        self.assertIsNone(m.to_legacy())
+        self.assertEqual(main.metric_views(m), {"metrics": None, "metric_values": m})
+
+    def test_to_legacy_never_raises_on_stored_rows(self):
+        # A fractional count stored before check_shape rejected it
+        raw = dimensional_payload()
+        raw["values"]["mistakes"][0] = 2.5
+        m = main.load_metrics(raw)
+        self.assertIsNone(m.to_legacy())
+        self.assertEqual(main.metric_views(m)["metric_values"], m)
+
+
+class TestMetricArrayMigration(unittest.TestCase):
+
+    def setUp(self):
+        Base.metadata.drop_all(bind=main.engine)
+        Base.metadata.create_all(bind=main.engine)
+        main.migrate_change_feed()
+
+    def add_row(self, raw, deleted=False):
+        db = main.SessionLocal()
+        try:
+            item = ScorecardDB(
+                month="January 2026",
+                manager_name="m",
+                mall_name="mall",
+                total_score=0,
+                raw_metrics=raw,
+                breakdown={},
+                change_seq=main.next_change_seq(db),
+                deleted_at=datetime.utcnow() if deleted else None,
+            )
+            db.add(item)
+            db.commit()
+            return item.id
+        finally:
+            db.close()
+
+    def stored(self, id):
+        db = main.SessionLocal()
+        try:
+            item = db.query(ScorecardDB).filter(ScorecardDB.id == id).one()
+            return item.raw_metrics, item.change_seq
+        finally:
+            db.close()
+
+    def test_rewrites_live_legacy_rows(self):
+        legacy = self.add_row(dict(SAMPLE))
+        tombstone = self.add_row(dict(SAMPLE), deleted=True)
+        broken = self.add_row({"google_rating_amritsari": 4.0})
+        current = self.add_row(dimensional_payload())
+
+        with self.assertLogs(main.logger, "WARNING"):
+            main.migrate_metric_arrays()
+
+        raw, seq = self.stored(legacy)
+        self.assertEqual(raw, dimensional_payload())
+        self.assertEqual(seq, 5)
+
+        self.assertEqual(self.stored(tombstone), (SAMPLE, 2))
+        self.assertEqual(self.stored(broken), ({"google_rating_amritsari": 4.0}, 3))
+        self.assertEqual(self.stored(current), (dimensional_payload(), 4))
+
+
+if __name__ == '__main__':
+    unittest.main()